@@ -14,6 +14,33 @@ import { formatTradeMessage, sendTelegramMessage } from './telegram.js';
 const router = Router();
 const OKX_API_URL = 'https://www.okx.com';  
 
+// Abort OKX requests that do not complete in time
+const OKX_REQUEST_TIMEOUT_MS = 10000;
+
+// Cap on response body characters written to logs
+const MAX_LOGGED_BODY_LENGTH = 512;
+
+// Maximum orders placed in parallel (Workers cap simultaneous outbound connections at 6)
+const MAX_CONCURRENT_ORDERS = 6;
+
+// Enables DEBUG-level logs and stack traces in error responses
+const DEBUG = false;
+
+// TradingView webhook source IPs
+const ALLOWED_IPS = new Set([
+  '52.89.214.238',
+  '34.212.75.30',
+  '54.218.53.128',
+  '52.32.178.7',
+  '91.148.238.131'
+]);
+
+const VALID_EXCHANGES = Object.freeze(['okx', 'bybit']);
+const TRADE_TYPES = Object.freeze(['spot', 'perps', 'invperps']);
+const MARGIN_MODES = Object.freeze(['cross', 'isolated']);
+const ORDER_SIDES = Object.freeze(['buy', 'sell']);
+const JSON_HEADERS = Object.freeze({ 'Content-Type': 'application/json' });
+
 //=============================================================================
 // [SECURITY] Security Functions
 //=============================================================================
@@ -24,21 +51,35 @@ const OKX_API_URL = 'https://www.okx.com';
  * @returns {boolean} True if IP is allowed, false otherwise
  */
 function isAllowedIp(clientIp) {
-  const allowedIps = [
-    '52.89.214.238',
-    '34.212.75.30',
-    '54.218.53.128',
-    '52.32.178.7',
-    '91.148.238.131'
-  ];
-  
-  return allowedIps.includes(clientIp);
+  return ALLOWED_IPS.has(clientIp);
 }
 
 //=============================================================================
 // [VALIDATION] Input Validation Functions
 //=============================================================================
 
+// Quantity is a positive decimal, optionally followed by a percent sign
+const QTY_PATTERN = /^\s*(\d+(?:\.\d*)?|\.\d+)\s*(%?)\s*$/;
+
+// Symbol and leverage requirements for each trade type
+const TRADE_TYPE_RULES = Object.freeze({
+  spot: {
+    symbolSuffixes: ['-USDT'],
+    symbolError: 'Spot symbols must end with -USDT',
+    requiresLeverage: false
+  },
+  perps: {
+    symbolSuffixes: ['-USDT-SWAP', '-USDC-SWAP'],
+    symbolError: 'USDT/USDC perpetual symbols must end with -USDT-SWAP or -USDC-SWAP',
+    requiresLeverage: true
+  },
+  invperps: {
+    symbolSuffixes: ['-USD-SWAP'],
+    symbolError: 'Inverse perpetual symbols must end with -USD-SWAP',
+    requiresLeverage: true
+  }
+});
+
 /**
  * Validates the webhook payload for required fields and correct values
  * @param {Object} payload - The webhook payload to validate
@@ -54,50 +95,29 @@ function validatePayload(payload) {
   if (!payload.exchange) throw new Error('Exchange is required');
   
   // Validate exchange
-  const validExchanges = ['okx', 'bybit'];
-  if (!validExchanges.includes(payload.exchange.toLowerCase())) {
-    throw new Error(`Invalid exchange. Must be one of: ${validExchanges.join(', ')}`);
+  if (!VALID_EXCHANGES.includes(payload.exchange.toLowerCase())) {
+    throw new Error(`Invalid exchange. Must be one of: ${VALID_EXCHANGES.join(', ')}`);
   }
   
   // Validate trade type
   const tradeType = payload.type.toLowerCase();
-  if (!['spot', 'perps', 'invperps'].includes(tradeType)) {
+  if (!TRADE_TYPES.includes(tradeType)) {
     throw new Error('Invalid type. Must be spot, perps, invperps');
   }
 
-  // Validate symbol format
-  switch(tradeType) {
-    case 'invperps':
-      if (!payload.symbol.endsWith('-USD-SWAP')) {
-        throw new Error('Inverse perpetual symbols must end with -USD-SWAP');
-      }
-      // Always require leverage for perpetual futures
-      if (!payload.leverage) {
-        throw new Error('Leverage is required for perpetual futures');
-      }
-      break;
-    case 'perps':
-      if (!payload.symbol.endsWith('-USDT-SWAP') && !payload.symbol.endsWith('-USDC-SWAP')) {
-        throw new Error('USDT/USDC perpetual symbols must end with -USDT-SWAP or -USDC-SWAP');
-      }
-      // Always require leverage for perpetual futures
-      if (!payload.leverage) {
-        throw new Error('Leverage is required for perpetual futures');
-      }
-      break;
-    case 'spot':
-      if (!payload.symbol.endsWith('-USDT')) {
-        throw new Error('Spot symbols must end with -USDT');
-      }
-      break;
-    default:
-      throw new Error('Invalid trade type. Must be invperps, perps, or spot');
+  // Validate symbol format and leverage from the trade type rules
+  const rules = TRADE_TYPE_RULES[tradeType];
+  if (!rules.symbolSuffixes.some(suffix => payload.symbol.endsWith(suffix))) {
+    throw new Error(rules.symbolError);
+  }
+  if (rules.requiresLeverage && !payload.leverage) {
+    throw new Error('Leverage is required for perpetual futures');
   }
 
   // Validate margin mode
   if (tradeType !== 'spot' && payload.marginMode) {
     const marginMode = payload.marginMode.toLowerCase();
-    if (!['cross', 'isolated'].includes(marginMode)) {
+    if (!MARGIN_MODES.includes(marginMode)) {
       throw new Error('Invalid margin mode. Must be cross or isolated');
     }
   }
@@ -106,20 +126,23 @@ function validatePayload(payload) {
   if (!payload.closePosition && !payload.side) {
     throw new Error('Side is required for entry orders');
   }
-  if (payload.side && !['buy', 'sell'].includes(payload.side.toLowerCase())) {
+  if (payload.side && !ORDER_SIDES.includes(payload.side.toLowerCase())) {
     throw new Error('Invalid side. Must be buy or sell');
   }
 
-  // Validate quantity format for percentage
-  if (payload.qty && payload.qty.includes('%')) {
-    const percentage = parseFloat(payload.qty);
-    if (isNaN(percentage) || percentage <= 0 || percentage > 100) {
-      throw new Error('Invalid percentage. Must be between 0 and 100');
+  // Validate quantity format (absolute value or percentage)
+  if (payload.qty) {
+    const match = QTY_PATTERN.exec(String(payload.qty));
+    if (!match) {
+      throw new Error('Invalid quantity format. Must be a number or percentage');
     }
-  } else if (payload.qty) {
-    // Validate quantity format for absolute value
-    const quantity = parseFloat(payload.qty);
-    if (isNaN(quantity) || quantity <= 0) {
+
+    const value = parseFloat(match[1]);
+    if (match[2] === '%') {
+      if (value <= 0 || value > 100) {
+        throw new Error('Invalid percentage. Must be between 0 and 100');
+      }
+    } else if (value <= 0) {
       throw new Error('Invalid quantity. Must be a positive number');
     }
   }
@@ -199,6 +222,23 @@ function getTimestamp() {
   return isoString.slice(0, -5) + 'Z';  
 }
 
+/**
+ * Runs an async task for each item with a bounded number in flight
+ * @param {Array} items - Items to process
+ * @param {number} limit - Maximum number of concurrent tasks
+ * @param {Function} task - Async function called with each item
+ * @returns {Promise<void>}
+ */
+async function runWithConcurrency(items, limit, task) {
+  let next = 0;
+  const workers = Array.from({ length: Math.min(limit, items.length) }, async () => {
+    while (next < items.length) {
+      await task(items[next++]);
+    }
+  });
+  await Promise.all(workers);
+}
+
 /**
  * Generates HMAC-SHA256 signature for API authentication
  * @param {string} timestamp - Current timestamp
@@ -389,6 +429,16 @@ function calculateOrderSize(maxQty, requestedQty, lotSize) {
   return roundedSize.toString();
 }
 
+/**
+ * Checks whether a quantity is expressed as a percentage
+ * @param {string} qty - Requested quantity (e.g., '50%' or '0.01')
+ * @returns {boolean} True if the quantity ends with a percent sign
+ */
+function isPercentageQty(qty) {
+  const value = String(qty).trim();
+  return value.slice(-1) === '%';
+}
+
 /**
  * Masks sensitive data in strings
  * @param {string} value - String to mask
@@ -469,7 +519,8 @@ async function makeOkxApiRequest(method, path, body, credentials, requestId, par
     const response = await fetch(`${OKX_API_URL}${path}`, {
       method,
       headers,
-      body: method === 'POST' ? body : undefined
+      body: method === 'POST' ? body : undefined,
+      signal: AbortSignal.timeout(OKX_REQUEST_TIMEOUT_MS)
     });
     
     const data = await response.json();
@@ -589,7 +640,7 @@ async function getMaxAvailSize(instId, credentials, requestId, payload) {
   }
 
   // Validate margin mode
-  if (!payload || !payload.marginMode || !['cross', 'isolated'].includes(payload.marginMode)) {
+  if (!payload || !payload.marginMode || !MARGIN_MODES.includes(payload.marginMode)) {
     createLog(LOG_LEVEL.API, `Invalid margin mode: ${payload?.marginMode}`, requestId);
     throw new Error('Invalid margin mode. Must be either "cross" or "isolated"');
   }
@@ -621,7 +672,10 @@ async function getMaxAvailSize(instId, credentials, requestId, payload) {
       );
 
       createLog(LOG_LEVEL.API, `Making request to: https://www.okx.com${path}${queryParams}`, requestId);
-      const response = await fetch(`https://www.okx.com${path}${queryParams}`, { headers });
+      const response = await fetch(`https://www.okx.com${path}${queryParams}`, {
+        headers,
+        signal: AbortSignal.timeout(OKX_REQUEST_TIMEOUT_MS)
+      });
       const data = await response.json();
       
       if (data.code !== '0') {
@@ -701,19 +755,24 @@ async function getAccountBalance(credentials, requestId) {
     );
 
     createLog(LOG_LEVEL.API, `Making request to: https://www.okx.com${path}`, requestId);
-    createLog(LOG_LEVEL.API, `Headers: ${JSON.stringify(headers, null, 2)}`, requestId);
+    createLog(LOG_LEVEL.DEBUG, {
+      operation: 'Request headers',
+      details: { headers: Object.keys(headers).join(', ') }
+    }, requestId);
 
     const response = await fetch(`https://www.okx.com${path}`, {
       method: 'GET',
-      headers
+      headers,
+      signal: AbortSignal.timeout(OKX_REQUEST_TIMEOUT_MS)
     });
 
     const text = await response.text();
-    createLog(LOG_LEVEL.API, `Response: ${text}`, requestId);
+    const loggedText = text.slice(0, MAX_LOGGED_BODY_LENGTH);
+    createLog(LOG_LEVEL.API, `Response: ${loggedText}`, requestId);
 
     const data = JSON.parse(text);
     if (!response.ok || data.code === '1') {
-      throw new Error(`Failed to get account balance: ${text}`);
+      throw new Error(`Failed to get account balance: ${loggedText}`);
     }
 
     return data.data[0];
@@ -783,7 +842,8 @@ async function getCurrentPosition(instId, credentials, requestId) {
     createLog(LOG_LEVEL.API, `Making request to: https://www.okx.com${path}`, requestId);
     const response = await fetch(`https://www.okx.com${path}`, {
       method: 'GET',
-      headers
+      headers,
+      signal: AbortSignal.timeout(OKX_REQUEST_TIMEOUT_MS)
     });
 
     const data = await response.json();
@@ -924,7 +984,8 @@ async function executeSpotTrade(payload, credentials, brokerTag, requestId, env,
     createLog('TRADE', 'Missing required parameter: symbol', requestId);
     return { successful: 0, failed: 1, sz: 0 };
   }
-  if (!payload.side || !['buy', 'sell'].includes(payload.side.toLowerCase())) {
+  const side = payload.side?.toLowerCase();
+  if (!ORDER_SIDES.includes(side)) {
     createLog('TRADE', `Invalid side parameter: ${payload.side}. Must be 'buy' or 'sell'`, requestId);
     return { successful: 0, failed: 1, sz: 0 };
   }
@@ -950,12 +1011,12 @@ async function executeSpotTrade(payload, credentials, brokerTag, requestId, env,
     const { maxBuy, maxSell } = await fetchMaxSize(instId, 'cash', null, credentials, requestId);
     
     // Calculate order size based on side and target currency
-    const isBuy = payload.side.toLowerCase() === 'buy';
+    const isBuy = side === 'buy';
     const maxQty = isBuy ? maxBuy : maxSell;
     let orderSize;
     
     try {
-      if (payload.qty.includes('%')) {
+      if (isPercentageQty(payload.qty)) {
         orderSize = calculateOrderSize(maxQty, payload.qty, instInfo.lotSz);
       } else {
         orderSize = roundToLotSize(parseFloat(payload.qty), instInfo.lotSz).toString();
@@ -984,7 +1045,7 @@ async function executeSpotTrade(payload, credentials, brokerTag, requestId, env,
       ordType: 'market',
       tag: brokerTag,
       clOrdId: generateClOrdId(payload.strategyId, brokerTag, '', requestId),
-      side: payload.side.toLowerCase(),
+      side: side,
       sz: orderSize,
       tgtCcy: isBuy ? 'base_ccy' : 'quote_ccy'  // base_ccy for buys, quote_ccy for sells
     };
@@ -1092,12 +1153,13 @@ async function openPerpsPosition(payload, credentials, brokerTag, requestId, env
   }
 
   // Validate margin mode
-  if (!['cross', 'isolated'].includes(payload.marginMode)) {
+  if (!MARGIN_MODES.includes(payload.marginMode)) {
     throw new Error('Invalid marginMode: must be either cross or isolated');
   }
 
   // Validate side
-  if (!['buy', 'sell'].includes(payload.side.toLowerCase())) {
+  const side = payload.side.toLowerCase();
+  if (!ORDER_SIDES.includes(side)) {
     throw new Error('Invalid side: must be either buy or sell');
   }
 
@@ -1119,7 +1181,7 @@ async function openPerpsPosition(payload, credentials, brokerTag, requestId, env
     }
 
     // Set leverage for opening position
-    const posSide = payload.side.toLowerCase() === 'buy' ? 'long' : 'short';
+    const posSide = side === 'buy' ? 'long' : 'short';
     await setLeverage({
       instId: instId,
       lever: payload.leverage.toString(),
@@ -1131,11 +1193,11 @@ async function openPerpsPosition(payload, credentials, brokerTag, requestId, env
     const { maxBuy, maxSell } = await fetchMaxSize(instId, payload.marginMode, posSide, credentials, requestId);
     
     // Calculate order size
-    const maxQty = payload.side.toLowerCase() === 'buy' ? maxBuy : maxSell;
+    const maxQty = side === 'buy' ? maxBuy : maxSell;
     let orderSize;
     
     try {
-      if (payload.qty.includes('%')) {
+      if (isPercentageQty(payload.qty)) {
         orderSize = calculateOrderSize(maxQty, payload.qty, instInfo.lotSz);
       } else {
         orderSize = roundToLotSize(parseFloat(payload.qty), instInfo.lotSz).toString();
@@ -1165,7 +1227,7 @@ async function openPerpsPosition(payload, credentials, brokerTag, requestId, env
       tag: brokerTag,
       clOrdId: generateClOrdId(payload.strategyId, brokerTag, '', requestId),
       posSide: posSide,
-      side: payload.side.toLowerCase(),
+      side: side,
       sz: orderSize
     };
 
@@ -1216,7 +1278,7 @@ async function closePerpsPosition(payload, credentials, brokerTag, requestId, en
   }
 
   // Validate margin mode
-  if (!['cross', 'isolated'].includes(payload.marginMode)) {
+  if (!MARGIN_MODES.includes(payload.marginMode)) {
     throw new Error('Invalid marginMode: must be either cross or isolated');
   }
 
@@ -1353,11 +1415,13 @@ async function openInvPerpsPosition(payload, credentials, brokerTag, requestId,
   }
 
   // Validate margin mode
-  if (!['cross', 'isolated'].includes(payload.marginMode)) {
+  if (!MARGIN_MODES.includes(payload.marginMode)) {
     createLog('TRADE', `Invalid marginMode: ${payload.marginMode}. Must be either cross or isolated`, requestId);
     return { successful: 0, failed: 1, sz: 0 };
   }
 
+  const side = payload.side.toLowerCase();
+
   try {
     const instId = formatTradingPair(payload.symbol, 'invperps');
     
@@ -1369,7 +1433,7 @@ async function openInvPerpsPosition(payload, credentials, brokerTag, requestId,
     }
 
     // Set leverage for opening position
-    const posSide = payload.side.toLowerCase() === 'buy' ? 'long' : 'short';
+    const posSide = side === 'buy' ? 'long' : 'short';
     try {
       await setLeverage({
         instId: instId,
@@ -1386,11 +1450,11 @@ async function openInvPerpsPosition(payload, credentials, brokerTag, requestId,
     const { maxBuy, maxSell } = await fetchMaxSize(instId, payload.marginMode, posSide, credentials, requestId);
     
     // Calculate order size
-    const maxQty = payload.side.toLowerCase() === 'buy' ? maxBuy : maxSell;
+    const maxQty = side === 'buy' ? maxBuy : maxSell;
     let orderSize;
     
     try {
-      if (payload.qty.includes('%')) {
+      if (isPercentageQty(payload.qty)) {
         orderSize = calculateOrderSize(maxQty, payload.qty, instInfo.lotSz);
       } else {
         orderSize = roundToLotSize(parseFloat(payload.qty), instInfo.lotSz).toString();
@@ -1425,7 +1489,7 @@ async function openInvPerpsPosition(payload, credentials, brokerTag, requestId,
       tag: brokerTag,
       clOrdId: generateClOrdId(payload.strategyId, brokerTag, '', requestId),
       posSide: posSide,
-      side: payload.side.toLowerCase(),
+      side: side,
       sz: orderSize
     };
 
@@ -1722,7 +1786,8 @@ async function setLeverage(data, credentials, requestId, env, parentOpId = null)
     const response = await fetch(`https://www.okx.com${path}`, {
       method: 'POST',
       headers,
-      body
+      body,
+      signal: AbortSignal.timeout(OKX_REQUEST_TIMEOUT_MS)
     });
   
     const result = await response.json();
@@ -1768,6 +1833,48 @@ async function setLeverage(data, credentials, requestId, env, parentOpId = null)
   }
 }
 
+/**
+ * Creates an order record for multi-account execution
+ * Every record has the same fields so the records stay one object shape
+ * @param {Object} order - Order data, or account summary if preparation failed
+ * @param {Object} credentials - Account API credentials
+ * @param {boolean} success - Whether the order has succeeded so far
+ * @param {string|null} [error=null] - Failure reason
+ * @returns {Object} Order record
+ */
+function createOrderRecord(order, credentials, success, error = null) {
+  return { order, credentials, success, error };
+}
+
+/**
+ * Sends a Telegram notification without holding up the webhook response
+ * @param {Object} telegramMsg - Message object from formatTradeMessage
+ * @param {Object} env - Environment variables
+ * @param {Object} ctx - Worker execution context (optional)
+ * @param {string} requestId - Request identifier
+ * @param {string} [opId=null] - Operation ID for error logging
+ * @returns {Promise<void>}
+ */
+async function queueTelegramMessage(telegramMsg, env, ctx, requestId, opId = null) {
+  const delivery = sendTelegramMessage(telegramMsg.type, telegramMsg.message, env)
+    .catch(error => {
+      createLog('ERROR', {
+        operation: 'Notification sending',
+        status: 'failed',
+        details: { error: error.message },
+        opId
+      }, requestId);
+    });
+
+  // Let the runtime finish delivery after the response has been returned
+  if (ctx?.waitUntil) {
+    ctx.waitUntil(delivery);
+    return;
+  }
+
+  await delivery;
+}
+
 /**
  * Execute trades for multiple accounts
  * @param {Object} payload - Trade payload
@@ -1776,9 +1883,10 @@ async function setLeverage(data, credentials, requestId, env, parentOpId = null)
  * @param {string} requestId - Request identifier
  * @param {Object} env - Environment variables
  * @param {string} parentOpId - Parent operation ID (optional)
+ * @param {Object} ctx - Worker execution context (optional)
  * @returns {Object} Trade results
  */
-async function executeMultiAccountTrades(payload, apiKeys, brokerTag, requestId, env, parentOpId = null) {
+async function executeMultiAccountTrades(payload, apiKeys, brokerTag, requestId, env, parentOpId = null, ctx = null) {
   // Start the operation tracking
   const opContext = startOperation('MultiAccountTrade', {
     accounts: apiKeys.length,
@@ -1825,15 +1933,7 @@ async function executeMultiAccountTrades(payload, apiKeys, brokerTag, requestId,
         }, requestId);
         
         // Add failed order to allOrders for credential issues
-        allOrders.push({
-          success: false,
-          order: {
-            accountId,
-            symbol: payload.symbol
-          },
-          credentials,
-          error: errorMsg
-        });
+        allOrders.push(createOrderRecord({ accountId, symbol: payload.symbol }, credentials, false, errorMsg));
         
         totalFailed++;
         continue;
@@ -1865,7 +1965,7 @@ async function executeMultiAccountTrades(payload, apiKeys, brokerTag, requestId,
           if (payload.dryRun) {
             result.orderData.dryRun = true;
           }
-          allOrders.push({ order: result.orderData, credentials, success: true });
+          allOrders.push(createOrderRecord(result.orderData, credentials, true));
           
           // End order preparation sub-operation with success
           endOperation(prepOpContext, {
@@ -1906,15 +2006,7 @@ async function executeMultiAccountTrades(payload, apiKeys, brokerTag, requestId,
           }, requestId);
           
           // Add failed order to allOrders
-          allOrders.push({
-            success: false,
-            order: {
-              accountId,
-              symbol: payload.symbol
-            },
-            credentials,
-            error: errorMsg
-          });
+          allOrders.push(createOrderRecord({ accountId, symbol: payload.symbol }, credentials, false, errorMsg));
           
           totalFailed++;
         }
@@ -1931,15 +2023,7 @@ async function executeMultiAccountTrades(payload, apiKeys, brokerTag, requestId,
         }, requestId);
         
         // Add failed order to allOrders for proper tracking
-        allOrders.push({
-          success: false,
-          order: {
-            accountId,
-            symbol: payload.symbol
-          },
-          credentials,
-          error: error.message
-        });
+        allOrders.push(createOrderRecord({ accountId, symbol: payload.symbol }, credentials, false, error.message));
         
         totalFailed++;
       }
@@ -1979,8 +2063,8 @@ async function executeMultiAccountTrades(payload, apiKeys, brokerTag, requestId,
       opId: opContext.operationId
     }, requestId);
 
-    // Execute each order individually
-    for (const orderObj of allOrders) {
+    // Execute orders across accounts with a bounded number in flight
+    await runWithConcurrency(allOrders, MAX_CONCURRENT_ORDERS, async (orderObj) => {
       try {
         const result = await placeOrder(orderObj.order, orderObj.credentials, requestId, env, execOpContext.operationId);
         
@@ -1996,7 +2080,7 @@ async function executeMultiAccountTrades(payload, apiKeys, brokerTag, requestId,
             },
             opId: execOpContext.operationId
           }, requestId);
-          allOrders[allOrders.indexOf(orderObj)].success = true;
+          orderObj.success = true;
         } else {
           totalFailed++;
           const errorMsg = result.error || 'Unknown error';
@@ -2009,8 +2093,8 @@ async function executeMultiAccountTrades(payload, apiKeys, brokerTag, requestId,
             },
             opId: execOpContext.operationId
           }, requestId);
-          allOrders[allOrders.indexOf(orderObj)].success = false;
-          allOrders[allOrders.indexOf(orderObj)].error = errorMsg;
+          orderObj.success = false;
+          orderObj.error = errorMsg;
         }
       } catch (error) {
         createLog('ERROR', {
@@ -2023,10 +2107,10 @@ async function executeMultiAccountTrades(payload, apiKeys, brokerTag, requestId,
           opId: execOpContext.operationId
         }, requestId);
         totalFailed++;
-        allOrders[allOrders.indexOf(orderObj)].success = false;
-        allOrders[allOrders.indexOf(orderObj)].error = error.message;
+        orderObj.success = false;
+        orderObj.error = error.message;
       }
-    }
+    });
     
     // End order execution sub-operation
     endOperation(execOpContext, {
@@ -2086,7 +2170,7 @@ async function executeMultiAccountTrades(payload, apiKeys, brokerTag, requestId,
       });
       
       if (telegramMsg) {
-        await sendTelegramMessage(telegramMsg.type, telegramMsg.message, env);
+        await queueTelegramMessage(telegramMsg, env, ctx, requestId, opContext.operationId);
       }
     } catch (error) {
       createLog('ERROR', {
@@ -2145,7 +2229,7 @@ async function executeMultiAccountTrades(payload, apiKeys, brokerTag, requestId,
         error: order.error
       }));
       if (telegramMsg) {
-        await sendTelegramMessage(telegramMsg.type, telegramMsg.message, env);
+        await queueTelegramMessage(telegramMsg, env, ctx, requestId, opContext.operationId);
       }
     } catch (telegramError) {
       createLog('ERROR', {
@@ -2193,15 +2277,15 @@ async function getApiKeys(env, requestId, exchange) {
       throw new Error(error);
     }
     
-    // Debug log (first 4 chars only)
-    for (const [index, key] of stmt.results.entries()) {
-      await createLog(LOG_LEVEL.INFO, 
-        `Key ${index + 1}: API=${mask(key.api_key)}, Secret=${mask(key.secret_key)}, Pass=${mask(key.passphrase)}`, 
-        requestId, 
-        null, 
-        env
-      );
-    }
+    // Debug log (first 4 chars only), batched into a single entry
+    logGroup(LOG_LEVEL.INFO, `Loaded ${stmt.results.length} ${normalizedExchange} key(s)`,
+      stmt.results.map((key, index) =>
+        `Key ${index + 1}: API=${mask(key.api_key)}, Secret=${mask(key.secret_key)}, Pass=${mask(key.passphrase)}`
+      ),
+      requestId,
+      null,
+      env
+    );
     
     return stmt.results;
   } catch (error) {
@@ -2231,13 +2315,20 @@ const LOG_LEVEL = {
   API: 'API'
 };
 
+// Shared number formatter, created on first use
+let numberFormatter = null;
+
 /**
  * Format number with thousands separator
  * @param {number} num Number to format
  * @returns {string} Formatted number
  */
 function formatNumber(num) {
-  return new Intl.NumberFormat('en-US').format(num);
+  // Intl formatters are expensive to construct, so build one lazily and reuse it
+  if (!numberFormatter) {
+    numberFormatter = new Intl.NumberFormat('en-US');
+  }
+  return numberFormatter.format(num);
 }
 
 /**
@@ -2272,7 +2363,7 @@ function formatTradeDetails(type, details) {
   const size = details.size || 0;
   const price = details.price || 0;
   const maxSize = details.maxSize || 1; // Avoid division by zero
-  const percentageUsed = details.qty?.includes('%') ? 
+  const percentageUsed = details.qty && isPercentageQty(details.qty) ? 
     details.qty : 
     `${(parseFloat(size) / parseFloat(maxSize) * 100).toFixed(2)}%`;
 
@@ -2389,9 +2480,14 @@ function formatTradeLogMessage(type, action, details, position = null) {
  * @param {string} requestId - Request identifier
  * @param {string} [apiKey] - Optional API key
  * @param {Object} [env] - Environment variables
- * @returns {Object} The log object that was created
+ * @returns {Object|null} The log object that was created, or null if the level is disabled
  */
 function createLog(level, message, requestId, apiKey = '', env = null) {
+  // Skip all formatting work for disabled debug logs
+  if (level === LOG_LEVEL.DEBUG && !DEBUG) {
+    return null;
+  }
+
   const shortRequestId = requestId ? requestId.substring(0, 8) : '--------';
   
   // Add transaction path for easier tracing
@@ -2669,7 +2765,7 @@ router.all('*', async (request, env) => {
       requestId
     }), {
       status: 403,
-      headers: { 'Content-Type': 'application/json' }
+      headers: JSON_HEADERS
     });
   }
   
@@ -2681,7 +2777,7 @@ router.all('*', async (request, env) => {
  * Main webhook endpoint handler
  * @returns {Response} Webhook processing response
  */
-router.post('/', async (request, env) => {
+router.post('/', async (request, env, ctx) => {
   // Use the requestId from the middleware
   const requestId = request.ctx?.requestId || crypto.randomUUID();
   
@@ -2707,9 +2803,10 @@ router.post('/', async (request, env) => {
     }, requestId, null, env);
     
     // Select broker tag based on exchange
-    const brokerTag = payload.exchange.toLowerCase() === 'okx' ? 
+    const exchange = payload.exchange.toLowerCase();
+    const brokerTag = exchange === 'okx' ? 
       env.BROKER_TAG_OKX : 
-      payload.exchange.toLowerCase() === 'bybit' ? 
+      exchange === 'bybit' ? 
         env.BROKER_TAG_BYBIT : 
         'default';
 
@@ -2727,7 +2824,9 @@ router.post('/', async (request, env) => {
       apiKeys, 
       brokerTag,
       requestId,
-      env
+      env,
+      null,
+      ctx
     );
     
     return new Response(JSON.stringify({
@@ -2738,7 +2837,7 @@ router.post('/', async (request, env) => {
       dryRun: isDryRun
     }), {
       status: 200,
-      headers: { 'Content-Type': 'application/json' }
+      headers: JSON_HEADERS
     });
   } catch (error) {
     await createLog(LOG_LEVEL.ERROR, {
@@ -2758,7 +2857,7 @@ router.post('/', async (request, env) => {
         requestId
       }), {
         status: 401,
-        headers: { 'Content-Type': 'application/json' }
+        headers: JSON_HEADERS
       });
     }
     
@@ -2769,7 +2868,7 @@ router.post('/', async (request, env) => {
       details: DEBUG ? error.stack : undefined
     }), {
       status: 400,
-      headers: { 'Content-Type': 'application/json' }
+      headers: JSON_HEADERS
     });
   }
 });
@@ -11,6 +11,26 @@ const ICONS = {
   PARTIAL_CLOSE: '⚠️'
 };
 
+// Status line text and icon for each message type
+const STATUS_LABELS = Object.freeze({
+  SUCCESS: ['SUCCESS', ICONS.SUCCESS],
+  CLOSE: ['CLOSED', ICONS.SUCCESS],
+  PARTIAL_SUCCESS: ['PARTIAL SUCCESS', ICONS.PARTIAL_SUCCESS],
+  PARTIAL_CLOSE: ['PARTIAL SUCCESS', ICONS.PARTIAL_CLOSE],
+  ERROR: ['FAILED', ICONS.ERROR]
+});
+
+// Abort Telegram requests that do not complete in time
+const TELEGRAM_TIMEOUT_MS = 5000;
+
+// Shared formatter for the alert timestamp, resolved once per isolate
+const TIME_FORMAT = new Intl.DateTimeFormat('en-US', {
+  hour: '2-digit',
+  minute: '2-digit',
+  hour12: false,
+  timeZoneName: 'short'
+});
+
 /**
  * Masks sensitive data for secure logging
  * @private
@@ -92,29 +112,10 @@ function formatTradeMessage({
   }
 
   // Determine status text and emoji
-  let statusText, statusEmoji;
-  if (type === 'ERROR') {
-    statusText = "FAILED";
-    statusEmoji = "❌";
-  } else if (type === 'PARTIAL_SUCCESS' || type === 'PARTIAL_CLOSE') {
-    statusText = "PARTIAL SUCCESS";
-    statusEmoji = "⚠️";
-  } else if (type === 'CLOSE') {
-    statusText = "CLOSED";
-    statusEmoji = "✅";
-  } else {
-    statusText = "SUCCESS";
-    statusEmoji = "✅";
-  }
+  const [statusText, statusEmoji] = STATUS_LABELS[type];
   
   // Get local time with timezone information
-  const now = new Date();
-  const timeWithZone = now.toLocaleTimeString('en-US', { 
-    hour: '2-digit', 
-    minute: '2-digit', 
-    hour12: false,
-    timeZoneName: 'short' 
-  });
+  const timeWithZone = TIME_FORMAT.format(new Date());
   
   // Build the message - HTML format is much simpler to work with
   let message = `<b>📢🚨TRADE EXECUTION ALERT!!🚨</b>\n\n`;
@@ -199,7 +200,8 @@ async function sendTelegramMessage(type, message, env) {
           text: message,
           parse_mode: 'HTML',
           disable_web_page_preview: true
-        })
+        }),
+        signal: AbortSignal.timeout(TELEGRAM_TIMEOUT_MS)
       }
     );
 
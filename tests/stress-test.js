@@ -13,12 +13,13 @@ const fs = require('fs');
 const CONFIG = {
   // Connection settings
   workerUrl: '', // Added https:// protocol
-  authToken: '', // URL encoded special characters
+  authToken: process.env.WEBHOOK_AUTH_TOKEN || '', // Read from the environment, never committed
   
   // Load testing parameters
   concurrentUsers: 1, // Increased to get meaningful data
   requestsPerUser: 5, // Increased to get meaningful data
   delayBetweenRequestsMs: 50, // Decreased to increase load
+  maxSockets: 10, // Upper bound on pooled keep-alive connections
   
   // Trade simulation parameters
   tradeTypes: ['spot'], // Can include: 'spot', 'perps', 'invperps'
@@ -30,6 +31,23 @@ const CONFIG = {
   logToConsole: true
 };
 
+// Shared keep-alive agent so requests reuse warm TLS connections instead of
+// paying a fresh TCP + TLS handshake per request
+const agent = new https.Agent({
+  keepAlive: true,
+  maxSockets: CONFIG.maxSockets
+});
+
+// Auth token pre-encoded once as the opening of every request body
+const BODY_PREFIX = `{"authToken":${JSON.stringify(CONFIG.authToken)},`;
+
+// Fields shared by every generated payload, built once
+const PAYLOAD_SKELETON = Object.freeze({
+  exchange: 'okx',
+  accounts: ['default'],
+  dryRun: true // Critical: prevents actual trading
+});
+
 /**
  * Generates a random trade payload
  * @returns {Object} Random trade payload
@@ -40,16 +58,13 @@ function generateTradePayload() {
   const tradeType = CONFIG.tradeTypes[Math.floor(Math.random() * CONFIG.tradeTypes.length)];
   
   return {
-    authToken: CONFIG.authToken,
+    ...PAYLOAD_SKELETON,
     symbol: symbol,
     action: action,
     side: action, // Include both for compatibility
     type: tradeType,
-    exchange: 'okx',
     qty: Math.random() < 0.2 ? '100%' : `${(Math.random() * 50 + 10).toFixed(2)}%`,
-    accounts: ['default'],
-    requestId: crypto.randomUUID(), // Unique ID for each request
-    dryRun: true // Critical: prevents actual trading
+    requestId: crypto.randomUUID() // Unique ID for each request
   };
 }
 
@@ -60,13 +75,16 @@ function generateTradePayload() {
 function sendRequest() {
   return new Promise((resolve, reject) => {
     const payload = generateTradePayload();
-    const data = JSON.stringify(payload);
+    // Splice the payload onto the pre-encoded auth prefix and serialize to bytes
+    // so Content-Length matches the wire body
+    const data = Buffer.from(BODY_PREFIX + JSON.stringify(payload).slice(1), 'utf8');
     
     const url = new URL(CONFIG.workerUrl);
     const options = {
       hostname: url.hostname,
       path: url.pathname,
       method: 'POST',
+      agent,
       headers: {
         'Content-Type': 'application/json',
         'Content-Length': data.length,
@@ -210,7 +228,7 @@ All requests will use dryRun=true to prevent actual trades
   
   // Prepare detailed results
   const detailedResults = {
-    config: CONFIG,
+    config: { ...CONFIG, authToken: undefined }, // Keep the token out of the results file
     summary: {
       totalRequests: flattened.length,
       successful,
@@ -249,8 +267,18 @@ Detailed results saved to: ${CONFIG.outputFile}
   `);
 }
 
-// Run the test
-runStressTest().catch(error => {
-  console.error('Stress test failed:', error);
+if (!CONFIG.authToken) {
+  console.error('Set WEBHOOK_AUTH_TOKEN before running the stress test');
   process.exit(1);
-});
+}
+
+// Run the test
+runStressTest()
+  .catch(error => {
+    console.error('Stress test failed:', error);
+    process.exitCode = 1;
+  })
+  .finally(() => {
+    // Close pooled sockets so the process can exit
+    agent.destroy();
+  });